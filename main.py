@@ -1,22 +1,60 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, validator, Field
-from typing import Optional
-import uuid
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+import io
+import re
+import secrets
 import os
+import time
+import base64
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import functools
+import hashlib
+import shutil
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import logging
+import httpx
+import uvloop
+import aiofiles
+import aiosqlite
+from pypdf import PdfReader, PdfWriter
 from weasyprint import HTML, CSS
 
+# Use uvloop for everything that isn't WeasyPrint - request parsing,
+# response dispatch, file serving. Installing it here (rather than relying
+# on uvicorn's --loop auto) keeps the choice deterministic however the app
+# is launched.
+uvloop.install()
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# Reject oversize bodies up front - Pydantic's max_length check only runs
+# after the whole payload has already been decoded into memory, so a 100MB
+# body would be fully allocated before being refused. Slightly above the
+# 1MB html limit to leave room for JSON escaping and the other fields.
+MAX_BODY_BYTES = 1_200_000
+# The batch endpoint legitimately carries many documents in one body
+MAX_BATCH_BODY_BYTES = 20_000_000
+
+
+@app.middleware("http")
+async def limit_body_size(request: Request, call_next):
+    limit = MAX_BATCH_BODY_BYTES if request.url.path.endswith("/batch") else MAX_BODY_BYTES
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        return ORJSONResponse(status_code=413, content={"detail": "Payload too large"})
+    return await call_next(request)
 
-# Add CORS middleware
+
+# Add CORS middleware - registered after the body-size limiter so it wraps
+# it (last added runs outermost) and browser clients can read 413 responses
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -32,50 +70,335 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
-# Thread pool untuk blocking operations
-executor = ThreadPoolExecutor(max_workers=2)
+
+# Thread pool untuk blocking operations - sized for I/O-style offload work
+EXECUTOR_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+# WeasyPrint is CPU-bound Python, so threads all serialize on the GIL;
+# a process pool lets N renders actually run on N cores
+RENDER_WORKERS = os.cpu_count() or 1
+
+
+def _init_render_worker():
+    """Warm fontconfig/pango caches once per worker instead of on first render"""
+    HTML(string="<p>warmup</p>").write_pdf(target=None)
+
+
+render_pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS, initializer=_init_render_worker)
+
+
+def _warm_noop():
+    """No-op pool task - spawning the worker runs _init_render_worker's warm-up"""
+    return None
+
+
+@app.on_event("startup")
+async def setup_executor():
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS))
+
+
+@app.on_event("startup")
+async def prewarm_render_pool():
+    # Pool workers spawn lazily, so without this the first request after
+    # boot eats the whole fontconfig scan (the classic multi-second
+    # cold-start). Submitting one task per worker forces them all up, and
+    # each initializer renders a trivial document to warm fontconfig/pango.
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(
+        *[loop.run_in_executor(render_pool, _warm_noop) for _ in range(RENDER_WORKERS)]
+    )
+    logger.info(f"Render pool warmed with {RENDER_WORKERS} workers")
+
+# Public base for stored certificate URLs - resolved once at import, not
+# re-read from the environment on every request
+BASE_URL = os.getenv("BASE_URL", "https://pycertgen-production.up.railway.app")
 
 # Certificate storage directory - Railway persistent volume
 CERTIFICATES_DIR = "/mnt/pdfs/generated"
 os.makedirs(CERTIFICATES_DIR, exist_ok=True)
 logger.info(f"Using certificates directory: {CERTIFICATES_DIR}")
 
+# Certificate metadata database - lives on the persistent volume next to
+# the PDFs themselves
+DB_PATH = "/mnt/pdfs/certificates.db"
+
+# Write-behind queue - handlers enqueue rows and answer immediately (the URL
+# is known up-front anyway), and a single consumer batches them into one
+# transaction, amortizing the commit fsync across a burst of requests
+DB_FLUSH_INTERVAL_SECONDS = 0.05
+DB_FLUSH_MAX_ROWS = 100
+
+INSERT_CERTIFICATE_SQL = "INSERT INTO certificates (filename, cert_url) VALUES (?, ?)"
+
+
+async def _db_writer():
+    while True:
+        batch = [await app.state.write_q.get()]
+        # Give a burst a moment to accumulate, then drain what's there
+        await asyncio.sleep(DB_FLUSH_INTERVAL_SECONDS)
+        while not app.state.write_q.empty() and len(batch) < DB_FLUSH_MAX_ROWS:
+            batch.append(app.state.write_q.get_nowait())
+        try:
+            await app.state.db.executemany(INSERT_CERTIFICATE_SQL, batch)
+            await app.state.db.commit()
+        except Exception as e:
+            logger.error(f"Failed to flush {len(batch)} certificate rows: {str(e)}")
+            # Requeue and back off - rows are plain strings, so failures here
+            # are transient (SQLITE_BUSY, disk pressure), not poison rows
+            for row in batch:
+                app.state.write_q.put_nowait(row)
+            await asyncio.sleep(1)
+
+
+@app.on_event("startup")
+async def setup_database():
+    # One long-lived connection; WAL + synchronous=NORMAL keeps concurrent
+    # inserts from serializing on the rollback journal and drops the
+    # per-commit fsync cost
+    db = await aiosqlite.connect(DB_PATH)
+    await db.execute("PRAGMA journal_mode=WAL")
+    await db.execute("PRAGMA synchronous=NORMAL")
+    await db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS certificates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT NOT NULL,
+            cert_url TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    await db.commit()
+    app.state.db = db
+    app.state.write_q = asyncio.Queue()
+    app.state.db_writer_task = asyncio.create_task(_db_writer())
+
+
+@app.on_event("shutdown")
+async def close_database():
+    app.state.db_writer_task.cancel()
+    # Flush anything still queued so rows aren't lost on shutdown
+    rows = []
+    while not app.state.write_q.empty():
+        rows.append(app.state.write_q.get_nowait())
+    if rows:
+        await app.state.db.executemany(INSERT_CERTIFICATE_SQL, rows)
+        await app.state.db.commit()
+    await app.state.db.close()
+
+
+# Content-addressed PDF cache - certificate HTML comes from a handful of
+# templates, so identical (html, width, height) requests are common; a hit
+# costs one hardlink instead of a full WeasyPrint render
+CACHE_DIR = "/mnt/pdfs/cache"
+os.makedirs(CACHE_DIR, exist_ok=True)
+PDF_CACHE_ENTRIES = 1024
+
+# LRU map of cache key -> cached PDF path
+pdf_cache: "OrderedDict[str, str]" = OrderedDict()
+
+
+# Everything on the volume is re-creatable (cache hit or re-render), so old
+# files get swept by a background task - never on the request path, where the
+# scan would cost O(files) syscalls per request
+CLEANUP_INTERVAL_SECONDS = 600
+CLEANUP_MAX_AGE_SECONDS = int(os.getenv("CLEANUP_MAX_AGE_SECONDS", 24 * 3600))
+
+
+def cleanup_old_files():
+    """Remove generated/cached PDFs older than CLEANUP_MAX_AGE_SECONDS"""
+    now = time.time()
+    for directory in (CERTIFICATES_DIR, CACHE_DIR):
+        # scandir's DirEntry carries cached stat info - one syscall per
+        # entry instead of the three from listdir + isfile + getmtime
+        with os.scandir(directory) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                if now - entry.stat().st_mtime > CLEANUP_MAX_AGE_SECONDS:
+                    try:
+                        os.remove(entry.path)
+                        logger.info(f"Cleaned up old file: {entry.path}")
+                    except OSError:
+                        pass
+
+
+async def _periodic_cleanup():
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(CLEANUP_INTERVAL_SECONDS)
+        # The sweep itself is all blocking syscalls - keep it off the loop
+        await loop.run_in_executor(None, cleanup_old_files)
+
+
+@app.on_event("startup")
+async def start_cleanup_task():
+    app.state.cleanup_task = asyncio.create_task(_periodic_cleanup())
+
+
+def _cache_key(html: str, width: float, height: float) -> str:
+    return hashlib.sha256(f"{width}x{height}|".encode() + html.encode()).hexdigest()
+
+
+# Generated PDFs never change under a given name, so downloads can be cached
+# hard and revalidated with a 0-byte 304
+PDF_CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+
+def _write_etag(pdf_path: str):
+    """Hash the finished PDF once at write time so downloads can 304"""
+    with open(pdf_path, "rb") as f:
+        etag = hashlib.sha256(f.read()).hexdigest()
+    with open(f"{pdf_path}.etag", "w") as f:
+        f.write(etag)
+
+
+def _read_etag(pdf_path: str) -> Optional[str]:
+    try:
+        with open(f"{pdf_path}.etag") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _publish_cached_pdf(cache_path: str, filepath: str):
+    """Hardlink (or copy, across filesystems) a cached PDF to its public name"""
+    for suffix in ("", ".etag"):
+        src = cache_path + suffix
+        dst = filepath + suffix
+        if not os.path.exists(src):
+            continue
+        if os.path.exists(dst):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+
+
+def _touch_cache_entry(key: str, cache_path: str):
+    """Record use in the LRU map, evicting the oldest cached PDFs past the cap"""
+    pdf_cache[key] = cache_path
+    pdf_cache.move_to_end(key)
+    while len(pdf_cache) > PDF_CACHE_ENTRIES:
+        _, old_path = pdf_cache.popitem(last=False)
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass
+
 class HtmlRequest(BaseModel):
     html: str = Field(..., max_length=1000000)  # Limit to 1MB
     viewport_width: float = Field(..., gt=0)  # Width in mm, required from Laravel
     viewport_height: float = Field(..., gt=0)  # Height in mm, required from Laravel
     certificate_id: Optional[str] = None  # Certificate ID from Laravel
 
-    @validator('html')
+    @field_validator('html')
+    @classmethod
     def html_must_not_be_empty(cls, v):
         if not v or not v.strip():
             raise ValueError('HTML content cannot be empty')
         return v
 
+    @field_validator('certificate_id')
+    @classmethod
+    def certificate_id_must_be_safe(cls, v):
+        # The ID becomes part of a filesystem path - reject traversal here
+        # so every endpoint that accepts one is covered
+        if v and (".." in v or "/" in v or "\\" in v):
+            raise ValueError('Invalid certificate ID')
+        return v
+
+# WeasyPrint fetches <img src> URLs serially inside the render (and slowly -
+# seconds per image); pre-fetching them concurrently on the event loop and
+# inlining as data: URIs keeps that I/O out of the render workers entirely
+_IMG_SRC_RE = re.compile(r'(<img\b[^>]*?\bsrc=["\'])(https?://[^"\']+)(["\'])', re.IGNORECASE)
+IMAGE_CACHE_ENTRIES = 256
+
+# LRU map of image URL -> data: URI
+image_cache: "OrderedDict[str, str]" = OrderedDict()
+
+
+@app.on_event("startup")
+async def setup_http_client():
+    app.state.http = httpx.AsyncClient(timeout=10, follow_redirects=True)
+
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await app.state.http.aclose()
+
+
+async def _fetch_image_data_uri(url: str) -> Optional[str]:
+    if url in image_cache:
+        image_cache.move_to_end(url)
+        return image_cache[url]
+    try:
+        resp = await app.state.http.get(url)
+        resp.raise_for_status()
+    except httpx.HTTPError as e:
+        # Leave the URL alone and let WeasyPrint take its chances
+        logger.warning(f"Could not prefetch image {url}: {e}")
+        return None
+    content_type = resp.headers.get("content-type", "image/png").split(";")[0]
+    data_uri = f"data:{content_type};base64,{base64.b64encode(resp.content).decode()}"
+    image_cache[url] = data_uri
+    while len(image_cache) > IMAGE_CACHE_ENTRIES:
+        image_cache.popitem(last=False)
+    return data_uri
+
+
+async def _inline_remote_images(html: str) -> str:
+    """Rewrite remote <img src> attributes to data: URIs, fetched in parallel"""
+    urls = list(dict.fromkeys(m.group(2) for m in _IMG_SRC_RE.finditer(html)))
+    if not urls:
+        return html
+    data_uris = await asyncio.gather(*[_fetch_image_data_uri(url) for url in urls])
+    mapping = {url: uri for url, uri in zip(urls, data_uris) if uri}
+    if not mapping:
+        return html
+    return _IMG_SRC_RE.sub(
+        lambda m: f"{m.group(1)}{mapping.get(m.group(2), m.group(2))}{m.group(3)}",
+        html,
+    )
+
+
 # PNG generation is not supported in this version of WeasyPrint
 # Only PDF generation is available
 
+@functools.lru_cache(maxsize=64)
+def _page_css(width: float, height: float) -> CSS:
+    """Parsed page-size stylesheet, memoized per worker.
+
+    Width/height come from a small discrete set (A4 landscape/portrait and a
+    few viewport sizes), and CSS objects are immutable and reusable across
+    write_pdf calls, so there is no reason to re-run the parser every render.
+    """
+    return CSS(string=f"""
+        @page {{
+            size: {width}mm {height}mm;
+            margin: 0;
+        }}
+        body {{
+            margin: 0;
+            padding: 0;
+        }}
+    """)
+
+
 def generate_pdf_blocking(html: str, filepath: str, width: float, height: float):
     """Blocking PDF generation function using WeasyPrint"""
     logger.info(f"Starting PDF generation for {filepath} with dimensions {width}mm x {height}mm")
 
     try:
-        # Create CSS for page size
-        css = CSS(string=f"""
-            @page {{
-                size: {width}mm {height}mm;
-                margin: 0;
-            }}
-            body {{
-                margin: 0;
-                padding: 0;
-            }}
-        """)
-        
+        css = _page_css(width, height)
+
         # Create HTML document and write directly to PDF with custom size
         html_doc = HTML(string=html)
         html_doc.write_pdf(filepath, stylesheets=[css])
-        
+        _write_etag(filepath)
+
         logger.info(f"PDF generation completed for {filepath}")
     except Exception as e:
         logger.error(f"Failed to generate PDF: {str(e)}")
@@ -84,76 +407,209 @@ def generate_pdf_blocking(html: str, filepath: str, width: float, height: float)
 # PNG generation is not supported in this version of WeasyPrint
 # Only PDF generation is available
 
+def generate_pdf_batch_blocking(docs: list, filepaths: list):
+    """Render N documents in one WeasyPrint pass and split the result per page.
+
+    docs is a list of (html, width, height) tuples, filepaths one output path
+    per document - strings and primitives only, so it pickles into the render
+    pool. Amortizes WeasyPrint's per-call setup (fonts, CSS parsing, writer
+    init) across the whole batch.
+    """
+    logger.info(f"Starting batch PDF generation for {len(docs)} documents")
+
+    # Named @page rules let each certificate keep its own page size inside
+    # the single combined document
+    # Break after every section except the last - a forced break after the
+    # final one can yield a trailing blank page and throw off the page count
+    rules = [
+        "body { margin: 0; padding: 0; }",
+        "section:not(:last-child) { page-break-after: always; }",
+    ]
+    sections = []
+    for i, (html, width, height) in enumerate(docs):
+        rules.append(f"@page cert{i} {{ size: {width}mm {height}mm; margin: 0; }}")
+        rules.append(f"section.cert{i} {{ page: cert{i}; }}")
+        sections.append(f'<section class="cert{i}">{html}</section>')
+
+    css = CSS(string="\n".join(rules))
+    pdf_bytes = HTML(string="".join(sections)).write_pdf(target=None, stylesheets=[css])
+
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    if len(reader.pages) != len(filepaths):
+        raise ValueError(
+            f"Batch produced {len(reader.pages)} pages for {len(filepaths)} documents; "
+            "each certificate must fit on a single page"
+        )
+    for page, filepath in zip(reader.pages, filepaths):
+        writer = PdfWriter()
+        writer.add_page(page)
+        with open(filepath, "wb") as f:
+            writer.write(f)
+        _write_etag(filepath)
+
+    logger.info(f"Batch PDF generation completed for {len(docs)} documents")
+
+
 @app.get("/get/{certificate_id}")
 async def get_certificate(certificate_id: str):
     """Check if a certificate already exists for the given ID"""
-    # Create a deterministic filename based on the certificate ID
-    filename = f"{certificate_id}.pdf"
-    filepath = f"{CERTIFICATES_DIR}/{filename}"
-    
     # Security check - ensure certificate_id is safe
     if ".." in certificate_id or "/" in certificate_id or "\\" in certificate_id:
         raise HTTPException(status_code=400, detail="Invalid certificate ID")
-    
-    # Check if the file exists
-    if os.path.exists(filepath) and filename.endswith(".pdf"):
-        logger.info(f"Certificate found for ID: {certificate_id}")
-        # Return URL path to the existing PDF
-        pdf_url = f"/pdfs/{filename}"
-        return JSONResponse({"pdf_url": pdf_url})
-    
-    # If file doesn't exist, return 404
-    logger.info(f"Certificate not found for ID: {certificate_id}")
-    raise HTTPException(status_code=404, detail="Certificate not found")
+
+    # Create a deterministic filename based on the certificate ID
+    filename = f"{certificate_id}.pdf"
+    filepath = os.path.join(CERTIFICATES_DIR, filename)
+
+    # One stat() instead of exists() - also avoids racing the cleanup task
+    try:
+        os.stat(filepath)
+    except FileNotFoundError:
+        logger.info(f"Certificate not found for ID: {certificate_id}")
+        raise HTTPException(status_code=404, detail="Certificate not found")
+
+    logger.info(f"Certificate found for ID: {certificate_id}")
+    # Return URL path to the existing PDF
+    pdf_url = f"/pdfs/{filename}"
+    return {"pdf_url": pdf_url}
 
 @app.post("/html-to-pdf")
-async def html_to_pdf(req: HtmlRequest):
+async def html_to_pdf(req: HtmlRequest, inline: bool = False):
     # Use certificate ID from Laravel if provided, otherwise generate a random one
     if req.certificate_id:
         filename = f"{req.certificate_id}.pdf"
     else:
-        filename = f"{uuid.uuid4()}.pdf"
+        filename = f"{secrets.token_urlsafe(16)}.pdf"
         
-    filepath = f"{CERTIFICATES_DIR}/{filename}"
+    filepath = os.path.join(CERTIFICATES_DIR, filename)
     
     # Use viewport dimensions from Laravel (required fields)
     width = req.viewport_width
     height = req.viewport_height
     
+    key = _cache_key(req.html, width, height)
+    cache_path = os.path.join(CACHE_DIR, f"{key}.pdf")
+
     try:
-        logger.info(f"Received request, generating {filename}")
+        if os.path.exists(cache_path):
+            logger.info(f"PDF cache hit, publishing {filename} without rendering")
+        else:
+            logger.info(f"Received request, generating {filename}")
 
-        # Run WeasyPrint in thread pool
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(
-            executor,
-            generate_pdf_blocking,
-            req.html,
-            filepath,
-            width,
-            height,
-        )
+            # Run WeasyPrint in the process pool - only strings/primitives
+            # cross the pickle boundary, and the handler itself stays async.
+            # Render to a temp name first so concurrent identical requests
+            # never see a half-written cache entry.
+            html = await _inline_remote_images(req.html)
+
+            tmp_path = f"{cache_path}.{secrets.token_urlsafe(8)}.tmp"
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                render_pool,
+                generate_pdf_blocking,
+                html,
+                tmp_path,
+                width,
+                height,
+            )
+            os.replace(tmp_path, cache_path)
+            os.replace(f"{tmp_path}.etag", f"{cache_path}.etag")
+
+        _publish_cached_pdf(cache_path, filepath)
+        _touch_cache_entry(key, cache_path)
+
+        # Record the certificate - cert_url is fully known up-front, so the
+        # row goes onto the write-behind queue and the response never waits
+        # on a SQLite commit
+        cert_url = f"{BASE_URL}/pdfs/{filename}"
+        await app.state.write_q.put((filename, cert_url))
 
         logger.info(f"Returning response for {filename}")
         # Return URL path to the stored PDF
         pdf_url = f"/pdfs/{filename}"
-        
-        return JSONResponse({"pdf_url": pdf_url})
+
+        if inline:
+            # Hand the bytes straight back - saves the client the second
+            # HTTP round-trip to /pdfs/ in the generate-and-download flow
+            async with aiofiles.open(cache_path, "rb") as f:
+                pdf_bytes = await f.read()
+            return Response(
+                content=pdf_bytes,
+                media_type="application/pdf",
+                headers={"X-Pdf-Url": pdf_url},
+            )
+
+        return {"pdf_url": pdf_url}
 
     except Exception as e:
         logger.error(f"Error generating PDF: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate PDF: {str(e)}")
 
+@app.post("/html-to-pdf/batch")
+async def html_to_pdf_batch(batch: List[HtmlRequest]):
+    if not batch:
+        raise HTTPException(status_code=400, detail="Batch cannot be empty")
+
+    filenames = [
+        f"{r.certificate_id}.pdf" if r.certificate_id else f"{secrets.token_urlsafe(16)}.pdf"
+        for r in batch
+    ]
+    filepaths = [os.path.join(CERTIFICATES_DIR, filename) for filename in filenames]
+
+    try:
+        logger.info(f"Received batch request for {len(batch)} certificates")
+
+        inlined = await asyncio.gather(*[_inline_remote_images(r.html) for r in batch])
+        docs = [
+            (html, r.viewport_width, r.viewport_height)
+            for html, r in zip(inlined, batch)
+        ]
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            render_pool,
+            generate_pdf_batch_blocking,
+            docs,
+            filepaths,
+        )
+
+        for filename in filenames:
+            await app.state.write_q.put((filename, f"{BASE_URL}/pdfs/{filename}"))
+
+        logger.info(f"Returning batch response for {len(batch)} certificates")
+        return {"pdf_urls": [f"/pdfs/{filename}" for filename in filenames]}
+
+    except Exception as e:
+        logger.error(f"Error generating PDF batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate PDF batch: {str(e)}")
+
+
 @app.get("/pdfs/{filename}")
-async def get_pdf(filename: str):
+async def get_pdf(filename: str, request: Request):
     # Security check - ensure filename is safe
     if ".." in filename or "/" in filename or "\\" in filename:
         raise HTTPException(status_code=400, detail="Invalid filename")
-    
+
+    if not filename.endswith(".pdf"):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    # One stat() instead of exists() + FileResponse's own check - avoids the
+    # TOCTOU window against the cleanup task and an extra syscall
     file_path = os.path.join(CERTIFICATES_DIR, filename)
-    if os.path.exists(file_path) and filename.endswith(".pdf"):
-        return FileResponse(file_path, media_type="application/pdf")
-    raise HTTPException(status_code=404, detail="File not found")
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    headers = dict(PDF_CACHE_HEADERS)
+    etag = _read_etag(file_path)
+    if etag:
+        headers["ETag"] = f'"{etag}"'
+        # Client already has these bytes - short-circuit with a 304
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+    # Hand Starlette the stat we already have so it doesn't repeat it
+    return FileResponse(file_path, media_type="application/pdf", headers=headers, stat_result=st)
 
 @app.get("/")
 async def root():